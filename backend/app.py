@@ -2,26 +2,147 @@
 FloatChat-AI Backend Server
 A Flask-based API server for oceanographic data chatbot
 """
+import atexit
+import logging
 import os
-from flask import Flask, request, jsonify
+import queue
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 from services.ai_service import AIService
 from services.data_service import DataService
-from db.session import SessionLocal
-from db.models import Base, ArgoRecord
+from db.session import SessionLocal, init_schema, sync_parquet_store, create_chat_job, finish_chat_job, get_chat_job
+from db.models import ArgoRecord
 
 load_dotenv()
 
+def _configure_logging():
+    """
+    Route log records through a queue to a background listener
+    
+    QueueHandler still formats the message (and any traceback) on the
+    calling thread, but the stream write and its lock happen on the
+    QueueListener thread, so a slow or contended stdout never blocks request
+    handling. Like logging.basicConfig, this leaves an already configured
+    root logger alone.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+
+# LOG_LEVEL also applies under gunicorn, where the __main__ block never runs
+_configure_logging()
+log = logging.getLogger(__name__)
+
+def _json_default(obj):
+    """Fallback for types orjson does not handle natively (e.g. Postgres AVG Decimals)"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider that serializes responses with orjson instead of stdlib json"""
+    
+    # No OPT_NAIVE_UTC: stored times are naive (sample data uses local time),
+    # so they serialize without an offset, like the isoformat() stats dates
+    option = orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_json_default, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_json_default, option=self.option),
+            mimetype="application/json"
+        )
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for React frontend
 
 # Initialize services
 data_service = DataService()
 ai_service = AIService()
 
+# Background chat jobs: LLM calls run on this pool while clients poll for the result.
+# Job state lives in the chat_job table, so any worker can answer the poll.
+_chat_pool = ThreadPoolExecutor(max_workers=int(os.getenv('CHAT_WORKERS', 8)))
+_CHAT_JOB_TTL = 600  # seconds
+
+# Records serialized per chunk of a streamed /api/data/query response
+_QUERY_STREAM_BATCH = 500
+
+def _json_body():
+    """Parse a JSON request body with orjson; returns None for non-JSON requests"""
+    if not request.is_json:
+        return None
+    return orjson.loads(request.get_data(cache=False) or b"{}")
+
+def _chat_message():
+    """Validate a chat request body; returns (message, None) or (None, error response)"""
+    try:
+        data = _json_body()
+    except orjson.JSONDecodeError:
+        return None, (jsonify({"error": "Invalid JSON body"}), 400)
+    
+    if not isinstance(data, dict) or 'message' not in data:
+        return None, (jsonify({"error": "Missing 'message' field"}), 400)
+    
+    if not isinstance(data.get('message'), str):
+        return None, (jsonify({"error": "'message' must be a string"}), 400)
+    
+    user_message = data['message'].strip()
+    
+    if not user_message:
+        return None, (jsonify({"error": "Message cannot be empty"}), 400)
+    
+    return user_message, None
+
+def _answer(user_message):
+    """Fetch relevant ARGO context and generate the AI reply for a message"""
+    context_data = data_service.get_relevant_context(user_message)
+    return ai_service.generate_response(user_message, context_data)
+
+def _run_chat_job(job_id, user_message):
+    """Answer a background chat job and store the outcome for whichever worker is polled"""
+    try:
+        reply, error = _answer(user_message), None
+    except Exception as e:
+        log.exception("❌ Error in chat job %s", job_id)
+        reply, error = None, str(e)
+    
+    # Nothing awaits the pool's Future, so a failed write must be logged here
+    try:
+        with SessionLocal() as session:
+            finish_chat_job(session, job_id, reply, error)
+            session.commit()
+    except Exception:
+        log.exception("❌ Error storing chat job %s", job_id)
+
 @app.route('/')
 def home():
     """Health check endpoint"""
@@ -47,31 +168,107 @@ def chat():
     }
     """
     try:
-        data = request.get_json()
+        user_message, error = _chat_message()
+        if error:
+            return error
         
-        if not data or 'message' not in data:
-            return jsonify({"error": "Missing 'message' field"}), 400
-        
-        user_message = data['message'].strip()
-        
-        if not user_message:
-            return jsonify({"error": "Message cannot be empty"}), 400
-        
-        # Get relevant ARGO data based on the query
-        context_data = data_service.get_relevant_context(user_message)
-        
-        # Generate AI response using the context
-        ai_response = ai_service.generate_response(user_message, context_data)
+        ai_response = _answer(user_message)
         
         return jsonify({"reply": ai_response})
     
     except Exception as e:
-        print(f"❌ Error in chat endpoint: {e}")
+        log.exception("❌ Error in chat endpoint: %s", e)
         return jsonify({
             "error": "Internal server error",
             "details": str(e)
         }), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Streaming variant of /api/chat using Server-Sent Events
+    
+    Request body is the same as /api/chat. Each token is sent as
+    `data: {"token": "..."}` and the stream ends with `event: done`.
+    If the model fails mid-reply, the stream instead ends with
+    `event: error` and `data: {"error": "...", "details": "..."}`, so the
+    tokens received so far are an incomplete answer.
+    """
+    user_message, error = _chat_message()
+    if error:
+        return error
+    
+    context_data = data_service.get_relevant_context(user_message)
+    
+    def events():
+        try:
+            for token in ai_service.stream_response(user_message, context_data):
+                yield b"data: " + orjson.dumps({"token": token}) + b"\n\n"
+        except Exception as e:
+            log.error("❌ Chat stream interrupted: %s", e)
+            error = {"error": "AI response interrupted", "details": str(e)}
+            yield b"event: error\ndata: " + orjson.dumps(error) + b"\n\n"
+            return
+        yield b"event: done\ndata: {}\n\n"
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/api/chat/jobs', methods=['POST'])
+def chat_job():
+    """
+    Submit a chat message to be answered in the background
+    
+    Request body is the same as /api/chat.
+    
+    Response (202):
+    {
+        "job_id": "3f2b..."
+    }
+    """
+    user_message, error = _chat_message()
+    if error:
+        return error
+    
+    job_id = uuid.uuid4().hex
+    with SessionLocal() as session:
+        create_chat_job(session, job_id, _CHAT_JOB_TTL)
+        session.commit()
+    _chat_pool.submit(_run_chat_job, job_id, user_message)
+    return jsonify({"job_id": job_id}), 202
+
+@app.route('/api/chat/result/<job_id>', methods=['GET'])
+def chat_result(job_id):
+    """
+    Poll a background chat job
+    
+    Response:
+    {
+        "done": true,
+        "reply": "Based on the ARGO data..."
+    }
+    """
+    with SessionLocal() as session:
+        job = get_chat_job(session, job_id, _CHAT_JOB_TTL)
+    
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    
+    if not job.done:
+        return jsonify({"done": False, "reply": None})
+    
+    if job.error is not None:
+        return jsonify({
+            "done": True,
+            "error": "Internal server error",
+            "details": job.error
+        }), 500
+    
+    return jsonify({"done": True, "reply": job.reply})
+
 @app.route('/api/data/stats', methods=['GET'])
 def get_stats():
     """
@@ -92,6 +289,29 @@ def get_stats():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/data/profiles', methods=['GET'])
+def get_profiles():
+    """
+    Get temperature vs depth profiles for one or more floats in one query
+    
+    Query string: repeat `platform` to pick floats
+    (e.g. /api/data/profiles?platform=2902746&platform=5904471);
+    omit it for every float.
+    
+    Returns:
+    {
+        "data": {
+            "2902746": [{"depth": 5.0, "temperature": 28.11}, ...]
+        }
+    }
+    """
+    try:
+        platforms = request.args.getlist('platform')
+        profiles = data_service.get_temperature_profiles(platforms or None)
+        return jsonify({"data": profiles})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/data/query', methods=['POST'])
 def query_data():
     """
@@ -107,11 +327,33 @@ def query_data():
     }
     """
     try:
-        filters = request.get_json() or {}
-        results = data_service.query_records(filters)
-        return jsonify({"data": results})
+        try:
+            filters = _json_body() or {}
+        except orjson.JSONDecodeError:
+            return jsonify({"error": "Invalid JSON body"}), 400
+        records = data_service.iter_records(filters)
+        # Pull the first row here so query errors still return a 500
+        first = next(records, None)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    
+    def dumps(record):
+        return orjson.dumps(record, default=_json_default, option=app.json.option)
+    
+    def body():
+        # Same bytes as dumping {"data": [...]} at once, sent a batch at a time
+        try:
+            yield b'{"data":['
+            if first is not None:
+                yield dumps(first)
+                for batch in iter(lambda: list(islice(records, _QUERY_STREAM_BATCH)), []):
+                    yield b"".join(b"," + dumps(record) for record in batch)
+            yield b"]}"
+        finally:
+            # Releases the DB session even if the client disconnects mid-stream
+            records.close()
+    
+    return Response(stream_with_context(body()), mimetype="application/json")
 
 @app.errorhandler(404)
 def not_found(e):
@@ -122,16 +364,18 @@ def internal_error(e):
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == '__main__':
-    # Ensure database tables exist
-    from db.session import engine
-    Base.metadata.create_all(bind=engine)
+    # Development server only; production runs `gunicorn wsgi:app` (see gunicorn.conf.py)
+    
+    # Under gunicorn the on_starting hook prepares the database; the dev server does it here
+    init_schema()
+    sync_parquet_store()
     
     # Get configuration from environment
     host = os.getenv('FLASK_HOST', '127.0.0.1')
     port = int(os.getenv('FLASK_PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
     
-    print(f"🌊 FloatChat-AI Server starting on http://{host}:{port}")
-    print(f"🔍 Debug mode: {debug}")
+    log.info("🌊 FloatChat-AI Server starting on http://%s:%s", host, port)
+    log.info("🔍 Debug mode: %s", debug)
     
     app.run(host=host, port=port, debug=debug)
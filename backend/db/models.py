@@ -1,15 +1,47 @@
 from sqlalchemy.orm import declarative_base, mapped_column, Mapped
-from sqlalchemy import Integer, Float, String, DateTime
+from sqlalchemy import Boolean, Integer, Float, String, Text, DateTime, Index
 
 Base = declarative_base()
 
 class ArgoRecord(Base):
     __tablename__ = "argo_data"
+    __table_args__ = (
+        # platform/depth lookups use the leading column of these composites
+        Index("ix_argo_platform_time", "platform", "time"),
+        Index("ix_argo_depth_temp", "depth", "temperature"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    time: Mapped[str] = mapped_column(DateTime)
+    time: Mapped[str] = mapped_column(DateTime, index=True)
     latitude: Mapped[float] = mapped_column(Float)
     longitude: Mapped[float] = mapped_column(Float)
     depth: Mapped[float] = mapped_column(Float)          # dbar
     temperature: Mapped[float] = mapped_column(Float, nullable=True)  # deg C
     salinity: Mapped[float] = mapped_column(Float, nullable=True)     # PSU
     platform: Mapped[str] = mapped_column(String, nullable=True)      # WMO
+
+class DatasetVersion(Base):
+    """Single-row counter bumped by every ingest so readers can detect stale caches"""
+    __tablename__ = "dataset_version"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+class ChatJob(Base):
+    """Background /api/chat/jobs request, readable by every worker process"""
+    __tablename__ = "chat_job"
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    created_at: Mapped[str] = mapped_column(DateTime, index=True)
+    done: Mapped[bool] = mapped_column(Boolean, default=False)
+    reply: Mapped[str] = mapped_column(Text, nullable=True)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+
+class TempProfile(Base):
+    """Per-platform temperature sums in PROFILE_DEPTH_BUCKET dbar depth bins, rebuilt after every ingest"""
+    __tablename__ = "argo_temp_profile"
+    __table_args__ = (
+        Index("ix_argo_temp_profile_platform_depth", "platform", "depth"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    platform: Mapped[str] = mapped_column(String, nullable=True)
+    depth: Mapped[float] = mapped_column(Float)
+    temp_sum: Mapped[float] = mapped_column(Float)
+    temp_count: Mapped[int] = mapped_column(Integer)
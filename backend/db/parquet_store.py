@@ -0,0 +1,156 @@
+"""
+Columnar copy of ingested ARGO measurements
+
+Each ingest appends a zstd-compressed Parquet part file so aggregate stats
+can be computed by DuckDB without scanning the row store. Rows already in
+argo_data when the store is first enabled (or found out of sync) are
+exported as a backfill file. Every file is named after the dataset version
+it brings the store up to, so readers can tell whether the store matches
+the database. Disabled unless ARGO_PARQUET_DIR is set.
+"""
+import glob
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+PARQUET_DIR = os.getenv("ARGO_PARQUET_DIR", "")
+
+# argo_v<version>_<stamp>_<id>.parquet holds the rows committed by one ingest;
+# argo_backfill_v<version>.parquet holds every row up to and including <version>
+_PART_RE = re.compile(r"argo_v(\d+)_\w+\.parquet$")
+_BACKFILL_RE = re.compile(r"argo_backfill_v(\d+)\.parquet$")
+
+def parquet_glob() -> str:
+    """Glob matching every Parquet part file"""
+    return os.path.join(PARQUET_DIR, "*.parquet")
+
+def _store_files():
+    """Versioned backfill files ({version: path}) and part files ({version: [paths]})"""
+    backfills, parts = {}, {}
+    for path in glob.glob(parquet_glob()):
+        name = os.path.basename(path)
+        match = _BACKFILL_RE.match(name)
+        if match:
+            backfills[int(match[1])] = path
+            continue
+        match = _PART_RE.match(name)
+        if match:
+            parts.setdefault(int(match[1]), []).append(path)
+    return backfills, parts
+
+def parquet_files(version: int) -> Optional[List[str]]:
+    """
+    Files holding exactly the rows of a dataset version
+    
+    An ingest that ran without ARGO_PARQUET_DIR leaves a gap in the part
+    file versions, and an orphaned part from a crashed ingest duplicates
+    one, so either makes the store unusable for that version.
+    
+    Args:
+        version: Dataset version the caller is reading (see get_dataset_version)
+    
+    Returns:
+        The newest backfill at or below version plus one part file per later
+        version, or None if the store is disabled, empty or out of sync
+    """
+    if not PARQUET_DIR:
+        return None
+    
+    backfills, parts = _store_files()
+    covered = [v for v in backfills if v <= version]
+    base = max(covered) if covered else 0
+    files = [backfills[base]] if covered else []
+    for v in range(base + 1, version + 1):
+        if len(parts.get(v, ())) != 1:
+            return None
+        files.extend(parts[v])
+    return files or None
+
+def append_parquet(df, version: int):
+    """
+    Write an ingested DataFrame as the part file for a dataset version
+    
+    Args:
+        df: The ingested measurements
+        version: Dataset version the ingest transaction is about to commit
+    
+    Returns:
+        The part file path, or None if disabled
+    """
+    if not PARQUET_DIR or df.empty:
+        return None
+    
+    # Store naive UTC like the SQL table so part files share one schema
+    if getattr(df["time"].dtype, "tz", None) is not None:
+        df = df.assign(time=df["time"].dt.tz_convert(None))
+    
+    os.makedirs(PARQUET_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(PARQUET_DIR, f"argo_v{version}_{stamp}_{uuid.uuid4().hex[:8]}.parquet")
+    df.to_parquet(path, compression="zstd", index=False)
+    return path
+
+def discard_parquet(path) -> None:
+    """Remove a part file whose ingest transaction failed, or an unused export"""
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def export_parquet(chunks):
+    """
+    Write DataFrame chunks (e.g. an export of argo_data) to a temporary file
+    
+    Readers ignore the file until install_backfill renames it into place.
+    
+    Returns:
+        The temporary file path, or None if disabled or there were no rows
+    """
+    if not PARQUET_DIR:
+        return None
+    
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    os.makedirs(PARQUET_DIR, exist_ok=True)
+    tmp_path = os.path.join(PARQUET_DIR, f"export_{uuid.uuid4().hex[:8]}.tmp")
+    writer = None
+    try:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    return tmp_path if writer is not None else None
+
+def install_backfill(tmp_path, version: int) -> str:
+    """
+    Rename an export into place as the backfill for a dataset version
+    
+    Concurrent exports of the same version just replace each other's
+    identical copy. Backfills and part files the new backfill supersedes
+    are removed; a reader still holding them falls back to SQL.
+    
+    Returns:
+        The backfill file path
+    """
+    path = os.path.join(PARQUET_DIR, f"argo_backfill_v{version}.parquet")
+    os.replace(tmp_path, path)
+    
+    backfills, parts = _store_files()
+    stale = [p for v, p in backfills.items() if v < version]
+    stale += [p for v, paths in parts.items() if v <= version for p in paths]
+    for old in stale:
+        try:
+            os.remove(old)
+        except FileNotFoundError:
+            pass
+    return path
@@ -1,9 +1,215 @@
+import logging
 import os
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, event, func, insert, inspect, select, update
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from db.models import Base, ArgoRecord, ChatJob, DatasetVersion, TempProfile
+from db.parquet_store import (
+    PARQUET_DIR, append_parquet, discard_parquet, export_parquet, install_backfill, parquet_files
+)
 
 load_dotenv()
 DB_URL = os.getenv("DB_URL", "sqlite:///argo.db")
-engine = create_engine(DB_URL, echo=False, future=True)
+log = logging.getLogger(__name__)
+
+def _engine_options(url: str) -> dict:
+    """Pool settings per backend"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        # Local file, so no pre-ping; connections may be handed across Flask threads
+        options = {"connect_args": {"check_same_thread": False}}
+        if parsed.database in (None, "", ":memory:"):
+            # An in-memory DB only exists on its one connection
+            options["poolclass"] = StaticPool
+        return options
+    return {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+    }
+
+engine = create_engine(DB_URL, echo=False, future=True, **_engine_options(DB_URL))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _):
+        # WAL + NORMAL sync lets bulk ingests commit without an fsync per page
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+        cur.close()
+
+_schema_initialized = False
+
+def init_schema():
+    """Create missing tables and indexes, at most once per process"""
+    global _schema_initialized
+    if _schema_initialized:
+        return
+    profile_missing = not inspect(engine).has_table(TempProfile.__tablename__)
+    Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add indexes introduced
+    # after a database was first created
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    if profile_missing:
+        # Backfill the pre-aggregated profile for data ingested before it existed
+        with SessionLocal() as session:
+            refresh_temp_profile(session)
+            session.commit()
+    _schema_initialized = True
+
+def sync_parquet_store() -> None:
+    """
+    Re-export argo_data when the Parquet store does not match the dataset version
+    
+    That happens when the columnar store was only just enabled, or missed an
+    ingest that ran without ARGO_PARQUET_DIR. The export reads the whole
+    table, so this runs from one-shot steps (gunicorn's on_starting hook,
+    the dev server, ingests), never per worker.
+    """
+    if not PARQUET_DIR:
+        return
+    with SessionLocal() as session:
+        version = get_dataset_version(session)
+    if parquet_files(version) is None:
+        _backfill_parquet()
+
+_PARQUET_EXPORT_CHUNK = 100_000  # rows per read_sql chunk
+_PARQUET_EXPORT_ATTEMPTS = 3
+
+def _backfill_parquet() -> None:
+    """
+    Export existing argo_data rows to the Parquet columnar store
+    
+    The export is only installed if the dataset version is unchanged once
+    it finishes, so the backfill holds exactly the rows of the version it
+    is named after; an ingest committing mid-export triggers a retry.
+    """
+    import pandas as pd
+    stmt = select(
+        ArgoRecord.time,
+        ArgoRecord.latitude,
+        ArgoRecord.longitude,
+        ArgoRecord.depth,
+        ArgoRecord.temperature,
+        ArgoRecord.salinity,
+        ArgoRecord.platform
+    )
+    for _ in range(_PARQUET_EXPORT_ATTEMPTS):
+        with SessionLocal() as session:
+            version = get_dataset_version(session)
+        with engine.connect() as conn:
+            tmp_path = export_parquet(pd.read_sql(stmt, conn, chunksize=_PARQUET_EXPORT_CHUNK))
+        with SessionLocal() as session:
+            current = get_dataset_version(session)
+        if current == version:
+            if tmp_path:
+                install_backfill(tmp_path, version)
+            return
+        discard_parquet(tmp_path)
+    log.warning("⚠️ Parquet backfill kept racing ingests; stats stay on SQL until the next start")
+
+def get_dataset_version(session) -> int:
+    """Current dataset version (0 before the first ingest)"""
+    return session.execute(
+        select(DatasetVersion.version).where(DatasetVersion.id == 1)
+    ).scalar() or 0
+
+def bump_dataset_version(session) -> int:
+    """Increment the dataset version inside the caller's ingest transaction; returns the new version"""
+    result = session.execute(
+        update(DatasetVersion)
+        .where(DatasetVersion.id == 1)
+        .values(version=DatasetVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        session.add(DatasetVersion(id=1, version=1))
+        return 1
+    return get_dataset_version(session)
+
+# Profile depths are averaged into bins of this many dbar
+PROFILE_DEPTH_BUCKET = 5.0
+
+def _utcnow() -> datetime:
+    """Naive UTC timestamp, matching the DateTime columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def create_chat_job(session, job_id: str, ttl: int) -> None:
+    """Record a pending chat job, dropping jobs older than ttl seconds"""
+    session.execute(delete(ChatJob).where(ChatJob.created_at < _utcnow() - timedelta(seconds=ttl)))
+    session.add(ChatJob(id=job_id, created_at=_utcnow(), done=False))
+
+def finish_chat_job(session, job_id: str, reply: str = None, error: str = None) -> None:
+    """Store a chat job's reply, or the error it failed with"""
+    session.execute(
+        update(ChatJob)
+        .where(ChatJob.id == job_id)
+        .values(done=True, reply=reply, error=error)
+    )
+
+def get_chat_job(session, job_id: str, ttl: int):
+    """The chat job with this id, or None if unknown or older than ttl seconds"""
+    return session.execute(
+        select(ChatJob)
+        .where(ChatJob.id == job_id)
+        .where(ChatJob.created_at >= _utcnow() - timedelta(seconds=ttl))
+    ).scalar()
+
+def refresh_temp_profile(session) -> None:
+    """Rebuild argo_temp_profile from argo_data inside the caller's ingest transaction"""
+    depth_bucket = func.round(ArgoRecord.depth / PROFILE_DEPTH_BUCKET) * PROFILE_DEPTH_BUCKET
+    session.execute(delete(TempProfile))
+    session.execute(
+        insert(TempProfile).from_select(
+            ["platform", "depth", "temp_sum", "temp_count"],
+            select(
+                ArgoRecord.platform,
+                depth_bucket,
+                func.sum(ArgoRecord.temperature),
+                func.count(ArgoRecord.temperature)
+            )
+            .where(ArgoRecord.temperature.isnot(None))
+            .group_by(ArgoRecord.platform, depth_bucket)
+        )
+    )
+
+def bulk_ingest(df) -> None:
+    """
+    Insert a DataFrame of measurements and refresh everything derived from them
+    
+    The row insert, the argo_temp_profile rebuild and the dataset version
+    bump commit together. The Parquet part file is named after the new
+    version and written just before that commit (and removed again if it
+    fails), so stats cached under the new version can never come from the
+    old part files.
+    """
+    init_schema()
+    sync_parquet_store()
+    # Convert each column once (times to python datetimes, the rest to
+    # native scalars) and zip them into row mappings for the bulk insert
+    cols = list(df.columns)
+    values = [
+        list(df[c].dt.to_pydatetime()) if c == "time" else df[c].tolist()
+        for c in cols
+    ]
+    records = [dict(zip(cols, row)) for row in zip(*values)]
+    with SessionLocal() as session:
+        session.bulk_insert_mappings(ArgoRecord, records)
+        refresh_temp_profile(session)
+        version = bump_dataset_version(session)
+        part = append_parquet(df, version)
+        try:
+            session.commit()
+        except Exception:
+            discard_parquet(part)
+            raise
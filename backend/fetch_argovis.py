@@ -1,22 +1,24 @@
 import os, datetime as dt, requests, pandas as pd
 from dotenv import load_dotenv
-from db.models import Base, ArgoRecord
-from db.session import engine, SessionLocal
+from db.session import bulk_ingest
 
 load_dotenv()
 
 # One known float operating in Indian Ocean
 FLOAT_ID = os.getenv("FLOAT_ID", "2902746")  # you can change this later
 
+# Reused across requests so repeated fetches keep the TCP/TLS connection alive
+_SESSION = requests.Session()
+_SESSION.headers.update({"Accept": "application/json", "Connection": "keep-alive"})
+
 def fetch_profiles():
     print(f"🔄 Fetching Argo data for float {FLOAT_ID} (Indian Ocean)...")
 
     base_url = "https://argovis2.colorado.edu/api/v2"
-    headers = {'Accept': 'application/json'}
     
     # Get platform data
     platform_url = f"{base_url}/platforms/ARGO/{FLOAT_ID}"
-    r = requests.get(platform_url, headers=headers, timeout=60)
+    r = _SESSION.get(platform_url, timeout=60)
     print(f"🔗 URL: {r.url}")
 
     if r.status_code != 200:
@@ -30,26 +32,28 @@ def fetch_profiles():
 
     print(f"✅ Received {len(data)} profiles for float {FLOAT_ID}.")
 
-    rows = []
+    # Flatten into parallel columns; dates are parsed in one vectorized call below
+    # (format="ISO8601" so dates with and without milliseconds both parse)
+    dates, lats, lons, depths, temps, sals = [], [], [], [], [], []
     for profile in data:
-        lat = profile.get("lat")
-        lon = profile.get("lon")
-        date = profile.get("date")
-        plat = FLOAT_ID
-
         measurements = profile.get("measurements", [])
-        for m in measurements:
-            rows.append({
-                "time": pd.to_datetime(date, utc=True),
-                "latitude": lat,
-                "longitude": lon,
-                "depth": m.get("pres"),
-                "temperature": m.get("temp"),
-                "salinity": m.get("psal"),
-                "platform": plat
-            })
+        n = len(measurements)
+        dates.extend([profile.get("date")] * n)
+        lats.extend([profile.get("lat")] * n)
+        lons.extend([profile.get("lon")] * n)
+        depths.extend(m.get("pres") for m in measurements)
+        temps.extend(m.get("temp") for m in measurements)
+        sals.extend(m.get("psal") for m in measurements)
 
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame({
+        "time": pd.to_datetime(dates, utc=True, format="ISO8601"),
+        "latitude": lats,
+        "longitude": lons,
+        "depth": depths,
+        "temperature": temps,
+        "salinity": sals,
+        "platform": FLOAT_ID
+    })
     print(f"📊 Flattened {len(df)} measurement rows.")
     return df
 
@@ -57,19 +61,7 @@ def ingest(df):
     if df.empty:
         print("⚠️ Nothing to ingest.")
         return
-    Base.metadata.create_all(bind=engine)
-    with SessionLocal() as s:
-        for _, r in df.iterrows():
-            s.add(ArgoRecord(
-                time=r["time"].to_pydatetime(),
-                latitude=r["latitude"],
-                longitude=r["longitude"],
-                depth=r["depth"],
-                temperature=r["temperature"],
-                salinity=r["salinity"],
-                platform=r["platform"]
-            ))
-        s.commit()
+    bulk_ingest(df)
     print(f"✅ Inserted {len(df)} rows into DB.")
 
 if __name__ == "__main__":
@@ -7,8 +7,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from db.models import Base, ArgoRecord
-from db.session import engine, SessionLocal
+from db.session import bulk_ingest, init_schema
 
 load_dotenv()
 
@@ -25,52 +24,46 @@ def generate_sample_data():
     num_profiles = 3
     measurements_per_profile = 50  # Depth levels
     
-    rows = []
+    rng = np.random.default_rng()
+    shape = (num_profiles, measurements_per_profile)
     
-    # Generate profiles over time
+    # Generate profiles over time, each ~10 days apart
     base_date = datetime.now() - timedelta(days=30)
+    profile_dates = [base_date + timedelta(days=i * 10) for i in range(num_profiles)]
     
-    for profile_idx in range(num_profiles):
-        # Each profile is ~10 days apart
-        profile_date = base_date + timedelta(days=profile_idx * 10)
-        
-        # Float drifts slightly
-        lat = base_lat + np.random.uniform(-0.5, 0.5)
-        lon = base_lon + np.random.uniform(-0.5, 0.5)
-        
-        # Generate depth profile (0 to ~2000 dbar)
-        depths = np.linspace(5, 2000, measurements_per_profile)
-        
-        for depth in depths:
-            # Temperature decreases with depth (realistic ocean profile)
-            # Surface: ~28°C, Deep: ~2°C
-            if depth < 100:
-                temp = 28 - (depth / 100) * 3  # Warm mixed layer
-            elif depth < 500:
-                temp = 25 - (depth - 100) / 400 * 15  # Thermocline
-            else:
-                temp = 10 - (depth - 500) / 1500 * 8  # Deep water
-            
-            # Add some random variation
-            temp += np.random.normal(0, 0.5)
-            
-            # Salinity is more stable (34-35 PSU typical)
-            if depth < 50:
-                sal = 34.5 + np.random.normal(0, 0.2)
-            else:
-                sal = 34.8 + np.random.normal(0, 0.15)
-            
-            rows.append({
-                "time": profile_date,
-                "latitude": lat,
-                "longitude": lon,
-                "depth": depth,
-                "temperature": round(temp, 2),
-                "salinity": round(sal, 2),
-                "platform": float_id
-            })
+    # Float drifts slightly between profiles
+    lats = base_lat + rng.uniform(-0.5, 0.5, size=num_profiles)
+    lons = base_lon + rng.uniform(-0.5, 0.5, size=num_profiles)
+    
+    # Generate depth profile (0 to ~2000 dbar), shared by every profile
+    depths = np.broadcast_to(np.linspace(5, 2000, measurements_per_profile), shape)
+    
+    # Temperature decreases with depth (realistic ocean profile)
+    # Surface: ~28°C, Deep: ~2°C
+    temps = np.select(
+        [depths < 100, depths < 500],
+        [
+            28 - (depths / 100) * 3,            # Warm mixed layer
+            25 - (depths - 100) / 400 * 15,     # Thermocline
+        ],
+        default=10 - (depths - 500) / 1500 * 8  # Deep water
+    )
+    # Add some random variation
+    temps = temps + rng.normal(0, 0.5, size=shape)
+    
+    # Salinity is more stable (34-35 PSU typical)
+    shallow = depths < 50
+    sals = np.where(shallow, 34.5, 34.8) + rng.normal(0, np.where(shallow, 0.2, 0.15), size=shape)
     
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame({
+        "time": np.repeat(profile_dates, measurements_per_profile),
+        "latitude": np.repeat(lats, measurements_per_profile),
+        "longitude": np.repeat(lons, measurements_per_profile),
+        "depth": depths.ravel(),
+        "temperature": temps.round(2).ravel(),
+        "salinity": sals.round(2).ravel(),
+        "platform": float_id
+    })
     print(f"✅ Generated {len(df)} synthetic measurements")
     return df
 
@@ -81,21 +74,10 @@ def ingest_data(df):
         return
     
     print("📥 Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    init_schema()
     
     print("📥 Inserting data into database...")
-    with SessionLocal() as session:
-        for _, row in df.iterrows():
-            session.add(ArgoRecord(
-                time=row["time"],
-                latitude=row["latitude"],
-                longitude=row["longitude"],
-                depth=row["depth"],
-                temperature=row["temperature"],
-                salinity=row["salinity"],
-                platform=row["platform"]
-            ))
-        session.commit()
+    bulk_ingest(df)
     
     print(f"✅ Inserted {len(df)} rows into database")
 
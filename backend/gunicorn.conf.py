@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for FloatChat-AI
+
+Loaded automatically when gunicorn is started from backend/.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# gevent workers overlap the long LLM waits instead of blocking a worker each
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gevent"
+worker_connections = 1000
+
+# LLM generations can take well over the 30s default
+timeout = 180
+
+def on_starting(server):
+    """
+    Create the database schema and sync the Parquet store once, before any worker forks
+    
+    Workers booting at the same time would otherwise race create_all on a
+    fresh database, and each would export all of argo_data for the Parquet
+    backfill. It runs in a child process so the master never imports
+    SQLAlchemy (and its locks) ahead of the workers' gevent monkey-patching.
+    """
+    script = "from db.session import init_schema, sync_parquet_store; init_schema(); sync_parquet_store()"
+    subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True
+    )
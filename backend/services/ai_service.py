@@ -2,12 +2,19 @@
 AI Service Module
 Handles AI-powered chat responses using OpenAI API or Ollama with ARGO data context
 """
+import logging
 import os
-from typing import Dict, Any, List
+import re
+import threading
+from typing import Dict, Any, List, Iterator
 import json
+
+import orjson
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 load_dotenv()
+log = logging.getLogger(__name__)
 
 # Check if OpenAI is available
 try:
@@ -15,15 +22,163 @@ try:
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
-    print("⚠️ OpenAI library not installed. Install with: pip install openai")
+    log.warning("⚠️ OpenAI library not installed. Install with: pip install openai")
 
 # Check if requests is available for Ollama
 try:
     import requests
+    from requests.adapters import HTTPAdapter
     REQUESTS_AVAILABLE = True
 except ImportError:
     REQUESTS_AVAILABLE = False
 
+# System prompt for the AI assistant
+_SYSTEM_PROMPT = """You are FloatChat, an expert oceanographic AI assistant specializing in ARGO float data analysis.
+
+ARGO floats are autonomous profiling instruments that drift with ocean currents and measure:
+- Temperature (°C)
+- Salinity (PSU - Practical Salinity Units)
+- Pressure/Depth (dbar - decibars)
+- Geographic position (latitude/longitude)
+
+Your role:
+1. Answer questions about oceanographic data from ARGO floats
+2. Interpret temperature, salinity, and depth measurements
+3. Explain ocean phenomena and patterns
+4. Provide insights based on the provided data context
+5. Be conversational yet scientific and accurate
+
+When provided with data context:
+- Reference specific measurements and statistics
+- Explain trends and patterns you observe
+- Compare values to typical ocean conditions
+- Mention the float ID and location when relevant
+
+If insufficient data is available, explain what data would be needed to answer properly.
+
+Always be helpful, clear, and scientifically accurate. Use appropriate units and explain technical terms."""
+
+class _SafeDict(dict):
+    """dict for str.format_map that renders missing keys as 'N/A'"""
+    
+    def __missing__(self, key):
+        return 'N/A'
+
+# (stats key, line template, defaults) rows rendered into the context overview
+_STAT_ROWS = (
+    ('date_range', "Date Range: {min} to {max}", {}),
+    ('depth_range', "Depth Range: {min} - {max} {unit}", {'unit': 'dbar'}),
+    ('temperature', "Temperature Range: {min} - {max} {unit}\nAverage Temperature: {avg} {unit}", {'unit': '°C'}),
+    ('salinity', "Salinity Range: {min} - {max} {unit}\nAverage Salinity: {avg} {unit}", {'unit': 'PSU'}),
+)
+
+_SAMPLE_TMPL = (
+    "  Time: {time}\n"
+    "  Position: {latitude}°N, {longitude}°E\n"
+    "  Depth: {depth} dbar\n"
+    "  Temperature: {temperature} °C\n"
+    "  Salinity: {salinity} PSU"
+)
+
+# Fallback intent keywords; group order is dispatch priority when several match
+_INTENT_RE = re.compile(
+    r"(?P<temperature>temperature|temp|warm|cold|hot)"
+    r"|(?P<salinity>salinity|salt|saline)"
+    r"|(?P<depth>depth|deep|shallow|surface)"
+    r"|(?P<overview>info|overview|summary|what|tell|about)"
+)
+_INTENT_PRIORITY = tuple(_INTENT_RE.groupindex)
+
+_OLLAMA_WARMUP_REPLY = "I'm warming up! This is your first query and the AI model is loading. Please try asking your question again in a few seconds. Subsequent responses will be much faster! 🚀"
+
+# Cache of AI replies keyed by (normalized message, dataset stats signature)
+_RESPONSE_CACHE_SIZE = 256
+_RESPONSE_CACHE_TTL = 300  # seconds
+
+# Static conversation opener sent after the system prompt. Keeping every
+# per-request part at the end makes the prompt prefix byte-identical across
+# calls, so OpenAI prompt caching can reuse it.
+_OPENAI_PRIMER = (
+    {"role": "user", "content": "For each question I will first send the currently available ARGO data context and then my question. Please provide a helpful, accurate response based on this data."},
+    {"role": "assistant", "content": "Understood. Send the data context and your question, and I will answer based on that ARGO data."},
+)
+
+# Canned replies used when no AI backend is available
+_NO_DATA_REPLY = """I don't have any ARGO data loaded yet. To get started:
+
+1. Make sure you have internet connection
+2. Run: python fetch_argovis.py
+3. This will download oceanographic data from ARGO floats
+
+Once data is loaded, I'll be able to answer questions about ocean temperature, salinity, and depth measurements!"""
+
+_TEMPERATURE_REPLY = """Based on the ARGO float data:
+
+**Temperature Statistics:**
+- Range: {min} to {max} {unit}
+- Average: {avg} {unit}
+
+The dataset contains {total_records:,} measurements from {float_count} float(s) in the Indian Ocean region.
+
+Note: For more detailed analysis, please set up your OPENAI_API_KEY in the .env file."""
+
+_SALINITY_REPLY = """Based on the ARGO float data:
+
+**Salinity Statistics:**
+- Range: {min} to {max} {unit}
+- Average: {avg} {unit}
+
+PSU (Practical Salinity Units) is the standard measure of ocean salinity. Typical ocean salinity is around 35 PSU.
+
+Note: For more detailed analysis, please set up your OPENAI_API_KEY in the .env file."""
+
+_DEPTH_REPLY = """Based on the ARGO float data:
+
+**Depth Coverage:**
+- Range: {min} to {max} {unit}
+
+ARGO floats typically profile from the surface down to 2000 meters, collecting data at various depths as they ascend.
+
+Note: For more detailed analysis, please set up your OPENAI_API_KEY in the .env file."""
+
+_OVERVIEW_REPLY = """**FloatChat ARGO Data Overview** 🌊
+
+I have access to {total_records:,} oceanographic measurements from the Indian Ocean region.
+
+**Dataset Details:**
+- Float ID(s): {floats}
+- Date Range: {min} to {max}
+- Measurements: Temperature, Salinity, Depth, Position
+
+**What I can help with:**
+- Ocean temperature patterns
+- Salinity variations
+- Depth profiles
+- Geographic analysis
+- Data trends and statistics
+
+Try asking me about temperature, salinity, or depth characteristics!
+
+Note: For AI-powered insights, please add your OPENAI_API_KEY to the .env file."""
+
+_DEFAULT_REPLY = """I'm FloatChat, your ARGO oceanographic data assistant! 🌊
+
+I have {total_records:,} measurements available from {float_count} float(s).
+
+**You can ask me about:**
+- Temperature statistics and ranges
+- Salinity measurements
+- Depth profiles
+- Geographic coverage
+- Data overview and summaries
+
+**Note:** AI-powered responses are currently unavailable. To enable full conversational AI:
+1. Get an OpenAI API key from https://platform.openai.com
+2. Add it to your .env file as OPENAI_API_KEY=your_key_here
+3. Restart the server
+
+I can still provide basic data analysis without AI!"""
+
 class AIService:
     """Service for generating AI responses with oceanographic context"""
     
@@ -36,16 +191,19 @@ class AIService:
         
         self.use_ai = False
         self.client = None
+        self._http = self._build_http_session() if REQUESTS_AVAILABLE else None
+        self._response_cache = TTLCache(maxsize=_RESPONSE_CACHE_SIZE, ttl=_RESPONSE_CACHE_TTL)
+        self._cache_lock = threading.Lock()
         
         # Try Ollama first if specified
         if self.ai_mode == 'ollama' and REQUESTS_AVAILABLE:
             if self._test_ollama():
                 self.use_ai = True
-                print(f"✅ Ollama connected successfully")
-                print(f"🤖 Using local model: {self.ollama_model}")
-                print(f"🔗 Ollama URL: {self.ollama_url}")
+                log.info("✅ Ollama connected successfully")
+                log.info("🤖 Using local model: %s", self.ollama_model)
+                log.info("🔗 Ollama URL: %s", self.ollama_url)
             else:
-                print("⚠️ Ollama not available, falling back to OpenAI or fallback mode")
+                log.warning("⚠️ Ollama not available, falling back to OpenAI or fallback mode")
                 self.ai_mode = 'openai'
         
         # Try OpenAI if Ollama not used or failed
@@ -54,61 +212,44 @@ class AIService:
                 try:
                     self.client = OpenAI(api_key=self.api_key)
                     self.use_ai = True
-                    print(f"✅ OpenAI client initialized successfully")
-                    print(f"🤖 Model: {self.model}")
-                    print(f"🔑 API Key configured (starts with: {self.api_key[:7]}...)")
+                    log.info("✅ OpenAI client initialized successfully")
+                    log.info("🤖 Model: %s", self.model)
+                    log.info("🔑 API Key configured (starts with: %s...)", self.api_key[:7])
                 except Exception as e:
-                    print(f"❌ Failed to initialize OpenAI: {e}")
+                    log.error("❌ Failed to initialize OpenAI: %s", e)
                     self.use_ai = False
             else:
                 if not self.api_key:
-                    print("⚠️ OPENAI_API_KEY not set in .env file")
+                    log.warning("⚠️ OPENAI_API_KEY not set in .env file")
                 elif self.api_key.startswith('your_'):
-                    print("⚠️ OPENAI_API_KEY is still placeholder")
+                    log.warning("⚠️ OPENAI_API_KEY is still placeholder")
                 elif not OPENAI_AVAILABLE:
-                    print("⚠️ OpenAI library not available")
+                    log.warning("⚠️ OpenAI library not available")
         
         if not self.use_ai:
-            print("💡 TIP: Install Ollama for free local AI: https://ollama.ai")
-            print("   Or add OpenAI credits at: https://platform.openai.com/billing")
+            log.info("💡 TIP: Install Ollama for free local AI: https://ollama.ai")
+            log.info("   Or add OpenAI credits at: https://platform.openai.com/billing")
         
-        self.system_prompt = self._build_system_prompt()
+        self.system_prompt = _SYSTEM_PROMPT
+    
+    @staticmethod
+    def _build_http_session() -> "requests.Session":
+        """Build a pooled keep-alive HTTP session reused across Ollama calls"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        return session
     
     def _test_ollama(self) -> bool:
         """Test if Ollama is running and accessible"""
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags", timeout=2)
+            response = self._http.get(f"{self.ollama_url}/api/tags", timeout=2)
             return response.status_code == 200
         except:
             return False
     
-    def _build_system_prompt(self) -> str:
-        """Build the system prompt for the AI assistant"""
-        return """You are FloatChat, an expert oceanographic AI assistant specializing in ARGO float data analysis.
-
-ARGO floats are autonomous profiling instruments that drift with ocean currents and measure:
-- Temperature (°C)
-- Salinity (PSU - Practical Salinity Units)
-- Pressure/Depth (dbar - decibars)
-- Geographic position (latitude/longitude)
-
-Your role:
-1. Answer questions about oceanographic data from ARGO floats
-2. Interpret temperature, salinity, and depth measurements
-3. Explain ocean phenomena and patterns
-4. Provide insights based on the provided data context
-5. Be conversational yet scientific and accurate
-
-When provided with data context:
-- Reference specific measurements and statistics
-- Explain trends and patterns you observe
-- Compare values to typical ocean conditions
-- Mention the float ID and location when relevant
-
-If insufficient data is available, explain what data would be needed to answer properly.
-
-Always be helpful, clear, and scientifically accurate. Use appropriate units and explain technical terms."""
-    
     def generate_response(self, user_message: str, context_data: Dict[str, Any]) -> str:
         """
         Generate AI response based on user message and data context
@@ -121,50 +262,94 @@ Always be helpful, clear, and scientifically accurate. Use appropriate units and
             AI-generated response string
         """
         if not self.use_ai:
-            print("⚠️ AI not available, using fallback response")
+            log.debug("⚠️ AI not available, using fallback response")
             return self._generate_fallback_response(user_message, context_data)
         
+        cache_key = self._cache_key(user_message, context_data)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Format context for the AI
             context_str = self._format_context(context_data)
             
             if self.ai_mode == 'ollama':
-                return self._call_ollama(user_message, context_str)
+                ai_response = self._call_ollama(user_message, context_str)
             else:
-                return self._call_openai(user_message, context_str)
+                ai_response = self._call_openai(user_message, context_str)
         
         except Exception as e:
-            print(f"❌ Error generating AI response: {e}")
-            print(f"❌ Error type: {type(e).__name__}")
+            log.error("❌ Error generating AI response (%s): %s", type(e).__name__, e)
             return self._generate_fallback_response(user_message, context_data)
+        
+        if ai_response is not _OLLAMA_WARMUP_REPLY:
+            self._store_cached(cache_key, ai_response)
+        return ai_response
     
-    def _call_openai(self, user_message: str, context_str: str) -> str:
-        """Call OpenAI API"""
-        messages = [
+    @staticmethod
+    def _cache_key(user_message: str, context_data: Dict[str, Any]) -> tuple:
+        """Key a reply on the normalized question and the dataset stats it was answered from"""
+        stats_sig = hash(orjson.dumps(context_data.get('stats', {}), option=orjson.OPT_SORT_KEYS))
+        return (user_message.lower().strip(), stats_sig)
+    
+    def _get_cached(self, key: tuple) -> Any:
+        with self._cache_lock:
+            return self._response_cache.get(key)
+    
+    def _store_cached(self, key: tuple, reply: str) -> None:
+        with self._cache_lock:
+            self._response_cache[key] = reply
+    
+    def _openai_messages(self, user_message: str, context_str: str) -> List[Dict[str, str]]:
+        """Build the chat messages with the static prefix first and the per-request parts last"""
+        return [
             {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": f"""User Question: {user_message}
-
-Available Data Context:
+            *_OPENAI_PRIMER,
+            {"role": "user", "content": f"""Available Data Context:
 {context_str}
 
-Please provide a helpful, accurate response based on this data."""}
+User Question: {user_message}"""}
         ]
-        
-        print(f"🤖 Calling OpenAI API with model: {self.model}")
+    
+    def _call_openai(self, user_message: str, context_str: str) -> str:
+        """Call OpenAI API"""
+        log.debug("🤖 Calling OpenAI API with model: %s", self.model)
         
         response = self.client.chat.completions.create(
             model=self.model,
-            messages=messages,
+            messages=self._openai_messages(user_message, context_str),
             temperature=0.7,
             max_tokens=800
         )
         
         ai_response = response.choices[0].message.content.strip()
-        print(f"✅ OpenAI response received ({len(ai_response)} chars)")
+        details = getattr(response.usage, 'prompt_tokens_details', None)
+        log.debug(
+            "✅ OpenAI response received (%d chars, %s/%s prompt tokens cached)",
+            len(ai_response),
+            getattr(details, 'cached_tokens', 0),
+            response.usage.prompt_tokens if response.usage else '?'
+        )
         return ai_response
     
-    def _call_ollama(self, user_message: str, context_str: str) -> str:
-        """Call Ollama local API with streaming for faster response"""
+    def _stream_openai(self, user_message: str, context_str: str) -> Iterator[str]:
+        """Call OpenAI API with stream=True, yielding content deltas as they arrive"""
+        log.debug("🤖 Streaming from OpenAI with model: %s", self.model)
+        
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._openai_messages(user_message, context_str),
+            temperature=0.7,
+            max_tokens=800,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _ollama_request(self, user_message: str, context_str: str, stream: bool) -> Dict[str, Any]:
+        """Build the Ollama /api/generate payload"""
         # Simplified prompt for faster processing
         prompt = f"""You are FloatChat, an oceanographic AI assistant analyzing ARGO float data.
 
@@ -174,34 +359,111 @@ Question: {user_message}
 
 Provide a clear, concise answer (2-3 paragraphs) based on the data."""
         
-        print(f"🤖 Calling Ollama with model: {self.ollama_model}")
+        return {
+            "model": self.ollama_model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.7,
+                "num_predict": 500,  # Reduced for faster response
+                "top_k": 40,
+                "top_p": 0.9
+            }
+        }
+    
+    def _call_ollama(self, user_message: str, context_str: str) -> str:
+        """Call Ollama local API and wait for the full response"""
+        log.debug("🤖 Calling Ollama with model: %s", self.ollama_model)
         
         try:
-            response = requests.post(
+            response = self._http.post(
                 f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.ollama_model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "num_predict": 500,  # Reduced for faster response
-                        "top_k": 40,
-                        "top_p": 0.9
-                    }
-                },
+                json=self._ollama_request(user_message, context_str, stream=False),
                 timeout=120  # Increased timeout
             )
             
             if response.status_code == 200:
                 ai_response = response.json().get('response', '').strip()
-                print(f"✅ Ollama response received ({len(ai_response)} chars)")
+                log.debug("✅ Ollama response received (%d chars)", len(ai_response))
                 return ai_response
             else:
                 raise Exception(f"Ollama error: {response.status_code}")
         except requests.exceptions.Timeout:
-            print("⚠️ Ollama timed out - the model might be loading for the first time")
-            return "I'm warming up! This is your first query and the AI model is loading. Please try asking your question again in a few seconds. Subsequent responses will be much faster! 🚀"
+            log.warning("⚠️ Ollama timed out - the model might be loading for the first time")
+            return _OLLAMA_WARMUP_REPLY
+    
+    def _stream_ollama(self, user_message: str, context_str: str) -> Iterator[str]:
+        """Call Ollama local API with stream=True, yielding tokens as they arrive"""
+        log.debug("🤖 Streaming from Ollama with model: %s", self.ollama_model)
+        
+        with self._http.post(
+            f"{self.ollama_url}/api/generate",
+            json=self._ollama_request(user_message, context_str, stream=True),
+            stream=True,
+            timeout=120
+        ) as response:
+            if response.status_code != 200:
+                raise Exception(f"Ollama error: {response.status_code}")
+            
+            # Ollama streams newline-delimited JSON objects
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = orjson.loads(line)
+                if chunk.get('response'):
+                    yield chunk['response']
+                if chunk.get('done'):
+                    break
+    
+    def stream_response(self, user_message: str, context_data: Dict[str, Any]) -> Iterator[str]:
+        """
+        Stream an AI response token by token
+        
+        Ollama and OpenAI replies are streamed; the rule-based fallback is
+        yielded as a single chunk from generate_response.
+        
+        Args:
+            user_message: The user's question or message
+            context_data: Dictionary containing relevant ARGO data and statistics
+        
+        Yields:
+            Response text fragments
+        
+        Raises:
+            Exception: if the model fails after some tokens were already
+                yielded, so the caller can tell a cut-off reply from a
+                finished one (errors before the first token still fall back)
+        """
+        if not self.use_ai:
+            yield self.generate_response(user_message, context_data)
+            return
+        
+        cache_key = self._cache_key(user_message, context_data)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        tokens = []
+        sent_any = False
+        try:
+            context_str = self._format_context(context_data)
+            stream = self._stream_ollama if self.ai_mode == 'ollama' else self._stream_openai
+            for token in stream(user_message, context_str):
+                sent_any = True
+                tokens.append(token)
+                yield token
+            self._store_cached(cache_key, "".join(tokens).strip())
+        except requests.exceptions.Timeout:
+            log.warning("⚠️ Ollama timed out - the model might be loading for the first time")
+            if sent_any:
+                raise
+            yield _OLLAMA_WARMUP_REPLY
+        except Exception as e:
+            log.error("❌ Error streaming AI response: %s", e)
+            if sent_any:
+                raise
+            yield self._generate_fallback_response(user_message, context_data)
     
     def _format_context(self, context_data: Dict[str, Any]) -> str:
         """Format context data into a readable string for the AI"""
@@ -217,43 +479,25 @@ Provide a clear, concise answer (2-3 paragraphs) based on the data."""
             parts.append("=== ARGO Dataset Overview ===")
             parts.append(f"Total Records: {stats.get('total_records', 0):,}")
             parts.append(f"Float IDs: {', '.join(stats.get('floats', []))}")
-            
-            if 'date_range' in stats:
-                dr = stats['date_range']
-                parts.append(f"Date Range: {dr.get('min', 'N/A')} to {dr.get('max', 'N/A')}")
-            
-            if 'depth_range' in stats:
-                dp = stats['depth_range']
-                parts.append(f"Depth Range: {dp.get('min', 'N/A')} - {dp.get('max', 'N/A')} {dp.get('unit', 'dbar')}")
-            
-            if 'temperature' in stats:
-                temp = stats['temperature']
-                parts.append(f"Temperature Range: {temp.get('min', 'N/A')} - {temp.get('max', 'N/A')} {temp.get('unit', '°C')}")
-                parts.append(f"Average Temperature: {temp.get('avg', 'N/A')} {temp.get('unit', '°C')}")
-            
-            if 'salinity' in stats:
-                sal = stats['salinity']
-                parts.append(f"Salinity Range: {sal.get('min', 'N/A')} - {sal.get('max', 'N/A')} {sal.get('unit', 'PSU')}")
-                parts.append(f"Average Salinity: {sal.get('avg', 'N/A')} {sal.get('unit', 'PSU')}")
+            parts.extend(
+                tmpl.format_map(_SafeDict(defaults, **stats[key]))
+                for key, tmpl, defaults in _STAT_ROWS
+                if key in stats
+            )
             
             if 'geographic_bounds' in stats:
                 geo = stats['geographic_bounds']
-                lat = geo.get('latitude', {})
-                lon = geo.get('longitude', {})
-                parts.append(f"Geographic Area: Lat {lat.get('min', 'N/A')}° to {lat.get('max', 'N/A')}°, Lon {lon.get('min', 'N/A')}° to {lon.get('max', 'N/A')}°")
+                lat = _SafeDict(geo.get('latitude', {}))
+                lon = _SafeDict(geo.get('longitude', {}))
+                parts.append(f"Geographic Area: Lat {lat['min']}° to {lat['max']}°, Lon {lon['min']}° to {lon['max']}°")
         
-        # Add sample data if available
-        if 'sample_data' in context_data and context_data['sample_data']:
+        # Add sample data if available (limited to 10 samples)
+        if context_data.get('sample_data'):
             parts.append("\n=== Sample Measurements ===")
-            samples = context_data['sample_data'][:10]  # Limit to 10 samples
-            
-            for i, sample in enumerate(samples, 1):
-                parts.append(f"\nMeasurement {i}:")
-                parts.append(f"  Time: {sample.get('time', 'N/A')}")
-                parts.append(f"  Position: {sample.get('latitude', 'N/A')}°N, {sample.get('longitude', 'N/A')}°E")
-                parts.append(f"  Depth: {sample.get('depth', 'N/A')} dbar")
-                parts.append(f"  Temperature: {sample.get('temperature', 'N/A')} °C")
-                parts.append(f"  Salinity: {sample.get('salinity', 'N/A')} PSU")
+            parts.extend(
+                f"\nMeasurement {i}:\n" + _SAMPLE_TMPL.format_map(_SafeDict(sample))
+                for i, sample in enumerate(context_data['sample_data'][:10], 1)
+            )
         
         return "\n".join(parts)
     
@@ -267,95 +511,48 @@ Provide a clear, concise answer (2-3 paragraphs) based on the data."""
         
         # Check if data exists
         if stats.get('total_records', 0) == 0:
-            return """I don't have any ARGO data loaded yet. To get started:
-
-1. Make sure you have internet connection
-2. Run: python fetch_argovis.py
-3. This will download oceanographic data from ARGO floats
-
-Once data is loaded, I'll be able to answer questions about ocean temperature, salinity, and depth measurements!"""
+            return _NO_DATA_REPLY
         
-        # Basic query understanding
+        # Basic query understanding: one scan finds every matching intent
         query_lower = user_message.lower()
-        
-        # Temperature queries
-        if any(word in query_lower for word in ['temperature', 'temp', 'warm', 'cold', 'hot']):
-            temp = stats.get('temperature', {})
-            return f"""Based on the ARGO float data:
-
-**Temperature Statistics:**
-- Range: {temp.get('min', 'N/A')} to {temp.get('max', 'N/A')} {temp.get('unit', '°C')}
-- Average: {temp.get('avg', 'N/A')} {temp.get('unit', '°C')}
-
-The dataset contains {stats.get('total_records', 0):,} measurements from {stats.get('float_count', 0)} float(s) in the Indian Ocean region.
-
-Note: For more detailed analysis, please set up your OPENAI_API_KEY in the .env file."""
-        
-        # Salinity queries
-        if any(word in query_lower for word in ['salinity', 'salt', 'saline']):
-            sal = stats.get('salinity', {})
-            return f"""Based on the ARGO float data:
-
-**Salinity Statistics:**
-- Range: {sal.get('min', 'N/A')} to {sal.get('max', 'N/A')} {sal.get('unit', 'PSU')}
-- Average: {sal.get('avg', 'N/A')} {sal.get('unit', 'PSU')}
-
-PSU (Practical Salinity Units) is the standard measure of ocean salinity. Typical ocean salinity is around 35 PSU.
-
-Note: For more detailed analysis, please set up your OPENAI_API_KEY in the .env file."""
-        
-        # Depth queries
-        if any(word in query_lower for word in ['depth', 'deep', 'shallow', 'surface']):
-            depth = stats.get('depth_range', {})
-            return f"""Based on the ARGO float data:
-
-**Depth Coverage:**
-- Range: {depth.get('min', 'N/A')} to {depth.get('max', 'N/A')} {depth.get('unit', 'dbar')}
-
-ARGO floats typically profile from the surface down to 2000 meters, collecting data at various depths as they ascend.
-
-Note: For more detailed analysis, please set up your OPENAI_API_KEY in the .env file."""
-        
-        # General info queries
-        if any(word in query_lower for word in ['info', 'overview', 'summary', 'what', 'tell', 'about']):
-            floats = ', '.join(stats.get('floats', []))
-            date_range = stats.get('date_range', {})
-            
-            return f"""**FloatChat ARGO Data Overview** 🌊
-
-I have access to {stats.get('total_records', 0):,} oceanographic measurements from the Indian Ocean region.
-
-**Dataset Details:**
-- Float ID(s): {floats}
-- Date Range: {date_range.get('min', 'N/A')} to {date_range.get('max', 'N/A')}
-- Measurements: Temperature, Salinity, Depth, Position
-
-**What I can help with:**
-- Ocean temperature patterns
-- Salinity variations
-- Depth profiles
-- Geographic analysis
-- Data trends and statistics
-
-Try asking me about temperature, salinity, or depth characteristics!
-
-Note: For AI-powered insights, please add your OPENAI_API_KEY to the .env file."""
+        intents = {m.lastgroup for m in _INTENT_RE.finditer(query_lower)}
+        handlers = {
+            'temperature': self._fallback_temperature,
+            'salinity': self._fallback_salinity,
+            'depth': self._fallback_depth,
+            'overview': self._fallback_overview,
+        }
+        for intent in _INTENT_PRIORITY:
+            if intent in intents:
+                return handlers[intent](stats)
         
         # Default response
-        return f"""I'm FloatChat, your ARGO oceanographic data assistant! 🌊
-
-I have {stats.get('total_records', 0):,} measurements available from {stats.get('float_count', 0)} float(s).
-
-**You can ask me about:**
-- Temperature statistics and ranges
-- Salinity measurements
-- Depth profiles
-- Geographic coverage
-- Data overview and summaries
-
-**Note:** AI-powered responses are currently unavailable. To enable full conversational AI:
-1. Get an OpenAI API key from https://platform.openai.com
-2. Add it to your .env file as OPENAI_API_KEY=your_key_here
-3. Restart the server
-
-I can still provide basic data analysis without AI!"""
+        return _DEFAULT_REPLY.format_map(self._reply_fields(stats))
+    
+    @staticmethod
+    def _reply_fields(stats: Dict[str, Any], section: str = None, **defaults) -> _SafeDict:
+        """Fields for a reply template: dataset totals plus one stats section"""
+        fields = _SafeDict(defaults)
+        if section:
+            fields.update(stats.get(section, {}))
+        fields['total_records'] = stats.get('total_records', 0)
+        fields['float_count'] = stats.get('float_count', 0)
+        return fields
+    
+    def _fallback_temperature(self, stats: Dict[str, Any]) -> str:
+        """Fallback response for temperature questions"""
+        return _TEMPERATURE_REPLY.format_map(self._reply_fields(stats, 'temperature', unit='°C'))
+    
+    def _fallback_salinity(self, stats: Dict[str, Any]) -> str:
+        """Fallback response for salinity questions"""
+        return _SALINITY_REPLY.format_map(self._reply_fields(stats, 'salinity', unit='PSU'))
+    
+    def _fallback_depth(self, stats: Dict[str, Any]) -> str:
+        """Fallback response for depth questions"""
+        return _DEPTH_REPLY.format_map(self._reply_fields(stats, 'depth_range', unit='dbar'))
+    
+    def _fallback_overview(self, stats: Dict[str, Any]) -> str:
+        """Fallback response for general dataset questions"""
+        fields = self._reply_fields(stats, 'date_range')
+        fields['floats'] = ', '.join(stats.get('floats', []))
+        return _OVERVIEW_REPLY.format_map(fields)
@@ -2,124 +2,299 @@
 Data Service Module
 Handles querying and aggregating ARGO oceanographic data from the database
 """
-from typing import Dict, List, Any, Optional
-from sqlalchemy import func, and_, desc
-from db.session import SessionLocal
-from db.models import ArgoRecord
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Any, Iterator, Optional
+import numpy as np
+import orjson
+from cachetools import TTLCache
+from sqlalchemy import func, and_, desc, distinct, lambda_stmt, select
+from db.session import SessionLocal, get_dataset_version
+from db.models import ArgoRecord, TempProfile
+from db.parquet_store import parquet_files
 from datetime import datetime
 
+log = logging.getLogger(__name__)
+
+# DuckDB is optional; used for stats when the Parquet columnar store is enabled
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+# Parquet counterpart of the single-pass stats query, in _build_stats argument order
+_PARQUET_STATS_SQL = """
+SELECT
+    count(*),
+    min(time), max(time),
+    min(depth), max(depth),
+    min(temperature), max(temperature), avg(temperature),
+    min(salinity), max(salinity), avg(salinity),
+    min(latitude), max(latitude),
+    min(longitude), max(longitude)
+FROM read_parquet(?)
+"""
+
+# How long cached stats and query results are trusted before re-checking
+# the dataset version
+_STATS_TTL = 300  # seconds
+
+# Sample-data context per (normalized query, dataset version)
+_CONTEXT_CACHE_SIZE = 256
+_CONTEXT_CACHE_TTL = 300  # seconds
+
+# Context samples / temperature profiles per (dataset version, arguments)
+_RESULT_CACHE_SIZE = 256
+_RESULT_CACHE_TTL = 120  # seconds
+
+# Rows fetched per round when streaming query results
+_RECORD_BATCH_SIZE = 500
+
+# Keys of each iter_records dict, in select() column order
+_RECORD_FIELDS = (
+    "id", "time", "latitude", "longitude",
+    "depth", "temperature", "salinity", "platform"
+)
+
+# The subset of _RECORD_FIELDS the AI prompt's sample template formats
+_CONTEXT_FIELDS = ("time", "latitude", "longitude", "depth", "temperature", "salinity")
+
+# Keyword buckets that pick the sample-data filters, classified in one scan
+_KEYWORD_RE = re.compile(
+    r"(?P<shallow>surface|shallow|top)"
+    r"|(?P<deep>deep|bottom|depth)"
+    r"|(?P<warm>warm|hot|temperature|temp)"
+    r"|(?P<sample>sample|show)"
+)
+
+# Filters contributed by each keyword bucket, in precedence order
+_KEYWORD_RULES = (
+    ('shallow', {'max_depth': 50, 'limit': 20}),
+    ('deep', {'min_depth': 500, 'limit': 20}),
+    ('warm', {'limit': 30}),
+)
+# How a filter set by more than one bucket is combined
+_FILTER_MERGE = {'limit': max, 'min_depth': max, 'max_depth': min}
+
+def _profile_points(rows) -> List[Dict[str, float]]:
+    """Turn (depth, avg_temp) rows into profile dicts, converting and rounding in one NumPy pass"""
+    if not rows:
+        return []
+    values = np.array(rows, dtype=float)
+    depths = values[:, 0].tolist()
+    temperatures = np.round(values[:, 1], 2).tolist()
+    return [
+        {"depth": depth, "temperature": temperature}
+        for depth, temperature in zip(depths, temperatures)
+    ]
+
 class DataService:
     """Service for querying ARGO float data"""
     
     def __init__(self):
-        self.session = None
+        self._stats_cache = None
+        self._stats_version = None
+        self._version = None
+        self._version_checked_at = 0.0
+        self._context_cache = TTLCache(maxsize=_CONTEXT_CACHE_SIZE, ttl=_CONTEXT_CACHE_TTL)
+        self._result_cache = TTLCache(maxsize=_RESULT_CACHE_SIZE, ttl=_RESULT_CACHE_TTL)
+        self._cache_lock = threading.Lock()
+    
+    def _dataset_version(self) -> int:
+        """Dataset version, re-read from the database at most every _STATS_TTL seconds"""
+        with self._cache_lock:
+            if (self._version is not None
+                    and time.monotonic() - self._version_checked_at < _STATS_TTL):
+                return self._version
+        
+        with SessionLocal() as session:
+            version = get_dataset_version(session)
+        with self._cache_lock:
+            self._version = version
+            self._version_checked_at = time.monotonic()
+        return version
     
-    def _get_session(self):
-        """Get database session"""
-        if not self.session:
-            self.session = SessionLocal()
-        return self.session
+    def _cached_result(self, key, compute):
+        """Return compute() through the result cache, keyed by key and the dataset version"""
+        key = (self._dataset_version(), key)
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable filter values (e.g. lists from a JSON body) skip the cache
+            return compute()
+        
+        with self._cache_lock:
+            cached = self._result_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        result = compute()
+        with self._cache_lock:
+            self._result_cache[key] = result
+        return result
     
     def get_dataset_stats(self) -> Dict[str, Any]:
         """
         Get overall statistics about the ARGO dataset
         
+        Cached stats are served without touching the database for up to
+        _STATS_TTL seconds; after that the dataset version is re-checked and
+        stats are recomputed only if an ingest has bumped it.
+        
         Returns:
             Dictionary containing dataset statistics
         """
-        session = self._get_session()
+        version = self._dataset_version()
+        with self._cache_lock:
+            if self._stats_cache is not None and self._stats_version == version:
+                return self._stats_cache
+        
+        stats = self._compute_dataset_stats(version)
+        with self._cache_lock:
+            self._stats_cache = stats
+            self._stats_version = version
+        return stats
+    
+    def _compute_dataset_stats(self, version: int) -> Dict[str, Any]:
+        """Run the aggregate queries behind get_dataset_stats for a dataset version"""
+        # The Parquet store is only used while it matches the database
+        files = parquet_files(version) if DUCKDB_AVAILABLE else None
+        if files:
+            try:
+                return self._get_parquet_stats(files)
+            except duckdb.Error:
+                # A concurrent backfill may have removed a superseded file
+                log.warning("⚠️ Parquet stats failed; falling back to SQL", exc_info=True)
         
         try:
-            # Count total records
-            total = session.query(func.count(ArgoRecord.id)).scalar() or 0
-            
-            if total == 0:
-                return {
-                    "total_records": 0,
-                    "message": "No data available. Please run fetch_argovis.py to ingest data."
-                }
-            
-            # Get unique floats
-            floats = session.query(ArgoRecord.platform).distinct().all()
-            float_list = [f[0] for f in floats if f[0]]
-            
-            # Date range
-            min_date = session.query(func.min(ArgoRecord.time)).scalar()
-            max_date = session.query(func.max(ArgoRecord.time)).scalar()
-            
-            # Depth range
-            min_depth = session.query(func.min(ArgoRecord.depth)).scalar()
-            max_depth = session.query(func.max(ArgoRecord.depth)).scalar()
-            
-            # Temperature range (excluding nulls)
-            temp_stats = session.query(
-                func.min(ArgoRecord.temperature),
-                func.max(ArgoRecord.temperature),
-                func.avg(ArgoRecord.temperature)
-            ).filter(ArgoRecord.temperature.isnot(None)).first()
-            
-            # Salinity range (excluding nulls)
-            sal_stats = session.query(
-                func.min(ArgoRecord.salinity),
-                func.max(ArgoRecord.salinity),
-                func.avg(ArgoRecord.salinity)
-            ).filter(ArgoRecord.salinity.isnot(None)).first()
-            
-            # Geographic bounds
-            lat_bounds = session.query(
-                func.min(ArgoRecord.latitude),
-                func.max(ArgoRecord.latitude)
-            ).first()
-            
-            lon_bounds = session.query(
-                func.min(ArgoRecord.longitude),
-                func.max(ArgoRecord.longitude)
-            ).first()
+            with SessionLocal() as session:
+                # Every aggregate in one table scan; MIN/MAX/AVG already skip NULLs
+                row = session.query(
+                    func.count(),
+                    func.min(ArgoRecord.time), func.max(ArgoRecord.time),
+                    func.min(ArgoRecord.depth), func.max(ArgoRecord.depth),
+                    func.min(ArgoRecord.temperature), func.max(ArgoRecord.temperature),
+                    func.avg(ArgoRecord.temperature),
+                    func.min(ArgoRecord.salinity), func.max(ArgoRecord.salinity),
+                    func.avg(ArgoRecord.salinity),
+                    func.min(ArgoRecord.latitude), func.max(ArgoRecord.latitude),
+                    func.min(ArgoRecord.longitude), func.max(ArgoRecord.longitude),
+                    *self._platforms_aggregate(session)
+                ).one()
+                
+                # Get unique floats (skipped for an empty table)
+                float_list = []
+                if row[0]:
+                    if len(row) > 15:
+                        floats = row[15]
+                        if isinstance(floats, str):
+                            floats = orjson.loads(floats)
+                    else:
+                        floats = [f[0] for f in session.query(ArgoRecord.platform).distinct()]
+                    float_list = [f for f in floats if f]
             
+            return self._build_stats(
+                row[0], float_list,
+                row[1:3], row[3:5], row[5:8], row[8:11], row[11:13], row[13:15]
+            )
+        
+        except Exception:
+            log.exception("❌ Error getting stats")
+            raise
+    
+    @staticmethod
+    def _platforms_aggregate(session) -> tuple:
+        """
+        DISTINCT-platform aggregate for the stats query, where the backend has one
+        
+        PostgreSQL returns array_agg as a Python list and SQLite returns
+        json_group_array as JSON text; other backends get an empty tuple and
+        fall back to a separate DISTINCT query.
+        """
+        dialect = session.get_bind().dialect.name
+        if dialect == "postgresql":
+            return (func.array_agg(distinct(ArgoRecord.platform)),)
+        if dialect == "sqlite":
+            return (func.json_group_array(distinct(ArgoRecord.platform)),)
+        return ()
+    
+    def _get_parquet_stats(self, files: List[str]) -> Dict[str, Any]:
+        """Compute dataset statistics from Parquet store files with DuckDB"""
+        with duckdb.connect() as con:
+            row = con.execute(_PARQUET_STATS_SQL, [files]).fetchone()
+            floats = con.execute(
+                "SELECT DISTINCT platform FROM read_parquet(?) WHERE platform IS NOT NULL",
+                [files]
+            ).fetchall()
+        
+        return self._build_stats(
+            row[0], [f[0] for f in floats],
+            row[1:3], row[3:5], row[5:8], row[8:11], row[11:13], row[13:15]
+        )
+    
+    @staticmethod
+    def _build_stats(total, float_list, date_range, depth_range, temp_stats,
+                     sal_stats, lat_bounds, lon_bounds) -> Dict[str, Any]:
+        """Shape raw aggregate values into the stats response"""
+        if not total:
             return {
-                "total_records": total,
-                "floats": float_list,
-                "float_count": len(float_list),
-                "date_range": {
-                    "min": min_date.isoformat() if min_date else None,
-                    "max": max_date.isoformat() if max_date else None
-                },
-                "depth_range": {
-                    "min": float(min_depth) if min_depth else None,
-                    "max": float(max_depth) if max_depth else None,
-                    "unit": "dbar"
-                },
-                "temperature": {
-                    "min": round(float(temp_stats[0]), 2) if temp_stats[0] else None,
-                    "max": round(float(temp_stats[1]), 2) if temp_stats[1] else None,
-                    "avg": round(float(temp_stats[2]), 2) if temp_stats[2] else None,
-                    "unit": "°C"
-                },
-                "salinity": {
-                    "min": round(float(sal_stats[0]), 2) if sal_stats[0] else None,
-                    "max": round(float(sal_stats[1]), 2) if sal_stats[1] else None,
-                    "avg": round(float(sal_stats[2]), 2) if sal_stats[2] else None,
-                    "unit": "PSU"
+                "total_records": 0,
+                "message": "No data available. Please run fetch_argovis.py to ingest data."
+            }
+        
+        min_date, max_date = date_range
+        min_depth, max_depth = depth_range
+        # DISTINCT order differs between SQL backends and DuckDB; sort so the
+        # response (and the AI cache key hashed from it) is stable
+        float_list = sorted(float_list)
+        
+        return {
+            "total_records": total,
+            "floats": float_list,
+            "float_count": len(float_list),
+            "date_range": {
+                "min": min_date.isoformat() if min_date else None,
+                "max": max_date.isoformat() if max_date else None
+            },
+            "depth_range": {
+                "min": float(min_depth) if min_depth else None,
+                "max": float(max_depth) if max_depth else None,
+                "unit": "dbar"
+            },
+            "temperature": {
+                "min": round(float(temp_stats[0]), 2) if temp_stats[0] else None,
+                "max": round(float(temp_stats[1]), 2) if temp_stats[1] else None,
+                "avg": round(float(temp_stats[2]), 2) if temp_stats[2] else None,
+                "unit": "°C"
+            },
+            "salinity": {
+                "min": round(float(sal_stats[0]), 2) if sal_stats[0] else None,
+                "max": round(float(sal_stats[1]), 2) if sal_stats[1] else None,
+                "avg": round(float(sal_stats[2]), 2) if sal_stats[2] else None,
+                "unit": "PSU"
+            },
+            "geographic_bounds": {
+                "latitude": {
+                    "min": float(lat_bounds[0]) if lat_bounds[0] else None,
+                    "max": float(lat_bounds[1]) if lat_bounds[1] else None
                 },
-                "geographic_bounds": {
-                    "latitude": {
-                        "min": float(lat_bounds[0]) if lat_bounds[0] else None,
-                        "max": float(lat_bounds[1]) if lat_bounds[1] else None
-                    },
-                    "longitude": {
-                        "min": float(lon_bounds[0]) if lon_bounds[0] else None,
-                        "max": float(lon_bounds[1]) if lon_bounds[1] else None
-                    }
+                "longitude": {
+                    "min": float(lon_bounds[0]) if lon_bounds[0] else None,
+                    "max": float(lon_bounds[1]) if lon_bounds[1] else None
                 }
             }
-        
-        except Exception as e:
-            print(f"Error getting stats: {e}")
-            raise
+        }
     
-    def query_records(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def iter_records(self, filters: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
         """
-        Query ARGO records with optional filters
+        Lazily yield ARGO records matching optional filters
+        
+        Rows are fetched and converted _RECORD_BATCH_SIZE at a time, so a
+        large limit never holds every row and every dict in memory at once.
+        The session stays open until the generator is exhausted or closed.
         
         Args:
             filters: Dictionary of filter parameters
@@ -129,50 +304,92 @@ class DataService:
                 - platform
                 - limit
         
-        Returns:
-            List of record dictionaries
+        Yields:
+            Record dictionaries, newest first, holding the raw column values
+            (``time`` stays a datetime)
         """
-        session = self._get_session()
+        # Select plain columns so rows come back as tuples, not ORM instances.
+        # lambda_stmt caches the compiled SQL per filter shape; the closure
+        # values below are extracted as bound parameters on each call.
+        stmt = lambda_stmt(lambda: select(
+            ArgoRecord.id,
+            ArgoRecord.time,
+            ArgoRecord.latitude,
+            ArgoRecord.longitude,
+            ArgoRecord.depth,
+            ArgoRecord.temperature,
+            ArgoRecord.salinity,
+            ArgoRecord.platform
+        ))
         
-        query = session.query(ArgoRecord)
+        stmt = self._filter_records(stmt, filters)
         
+        with SessionLocal() as session:
+            # yield_per as an execution option also sets stream_results, so
+            # PostgreSQL reads through a server-side cursor instead of
+            # buffering the whole result client-side
+            rows = session.execute(stmt, execution_options={"yield_per": _RECORD_BATCH_SIZE})
+            # Raw column values; orjson formats the datetimes and floats in C
+            for row in rows:
+                yield dict(zip(_RECORD_FIELDS, row))
+    
+    @staticmethod
+    def _filter_records(stmt, filters: Dict[str, Any]):
+        """Add the record filters, newest-first order and limit to a lambda_stmt"""
         # Apply filters
         if 'min_depth' in filters:
-            query = query.filter(ArgoRecord.depth >= filters['min_depth'])
+            min_depth = filters['min_depth']
+            stmt += lambda s: s.where(ArgoRecord.depth >= min_depth)
         if 'max_depth' in filters:
-            query = query.filter(ArgoRecord.depth <= filters['max_depth'])
+            max_depth = filters['max_depth']
+            stmt += lambda s: s.where(ArgoRecord.depth <= max_depth)
         
         if 'min_temp' in filters:
-            query = query.filter(ArgoRecord.temperature >= filters['min_temp'])
+            min_temp = filters['min_temp']
+            stmt += lambda s: s.where(ArgoRecord.temperature >= min_temp)
         if 'max_temp' in filters:
-            query = query.filter(ArgoRecord.temperature <= filters['max_temp'])
+            max_temp = filters['max_temp']
+            stmt += lambda s: s.where(ArgoRecord.temperature <= max_temp)
         
         if 'min_sal' in filters:
-            query = query.filter(ArgoRecord.salinity >= filters['min_sal'])
+            min_sal = filters['min_sal']
+            stmt += lambda s: s.where(ArgoRecord.salinity >= min_sal)
         if 'max_sal' in filters:
-            query = query.filter(ArgoRecord.salinity <= filters['max_sal'])
+            max_sal = filters['max_sal']
+            stmt += lambda s: s.where(ArgoRecord.salinity <= max_sal)
         
         if 'platform' in filters:
-            query = query.filter(ArgoRecord.platform == filters['platform'])
+            platform = filters['platform']
+            # A bound None would compare "= NULL" and match nothing
+            if platform is None:
+                stmt += lambda s: s.where(ArgoRecord.platform.is_(None))
+            else:
+                stmt += lambda s: s.where(ArgoRecord.platform == platform)
         
-        # Limit results
+        # Limit results; an explicit null limit returns every match
         limit = filters.get('limit', 100)
-        query = query.order_by(desc(ArgoRecord.time)).limit(limit)
-        
-        records = query.all()
+        stmt += lambda s: s.order_by(desc(ArgoRecord.time))
+        if limit is not None:
+            stmt += lambda s: s.limit(limit)
+        return stmt
+    
+    def _context_sample(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Recent records for the AI prompt, selecting only the _CONTEXT_FIELDS it formats"""
+        stmt = self._filter_records(lambda_stmt(lambda: select(
+            ArgoRecord.time,
+            ArgoRecord.latitude,
+            ArgoRecord.longitude,
+            ArgoRecord.depth,
+            ArgoRecord.temperature,
+            ArgoRecord.salinity
+        )), filters)
         
+        with SessionLocal() as session:
+            rows = session.execute(stmt).all()
+        # ISO times in the prompt, matching the API's datetime format
         return [
-            {
-                "id": r.id,
-                "time": r.time.isoformat() if r.time else None,
-                "latitude": float(r.latitude) if r.latitude else None,
-                "longitude": float(r.longitude) if r.longitude else None,
-                "depth": float(r.depth) if r.depth else None,
-                "temperature": float(r.temperature) if r.temperature else None,
-                "salinity": float(r.salinity) if r.salinity else None,
-                "platform": r.platform
-            }
-            for r in records
+            dict(zip(_CONTEXT_FIELDS, (time_.isoformat() if time_ else None, *rest)))
+            for time_, *rest in rows
         ]
     
     def get_relevant_context(self, user_query: str) -> Dict[str, Any]:
@@ -195,63 +412,132 @@ class DataService:
             "sample_data": []
         }
         
-        # Determine what kind of data to include
-        filters = {}
+        # The cached stats already say when there is nothing to sample
+        if not stats.get("total_records"):
+            return context
         
-        # Depth-related queries
-        if any(word in query_lower for word in ['surface', 'shallow', 'top']):
-            filters['max_depth'] = 50
-            filters['limit'] = 20
-        elif any(word in query_lower for word in ['deep', 'bottom', 'depth']):
-            filters['min_depth'] = 500
-            filters['limit'] = 20
+        # Reuse the sample data while the dataset is unchanged
+        cache_key = (query_lower.strip(), self._dataset_version())
+        with self._cache_lock:
+            cached = self._context_cache.get(cache_key)
+        if cached is not None:
+            context["sample_data"] = cached
+            return context
         
-        # Temperature queries
-        if any(word in query_lower for word in ['warm', 'hot', 'temperature', 'temp']):
-            filters['limit'] = 30
+        # Determine what kind of data to include
+        keywords = {m.lastgroup for m in _KEYWORD_RE.finditer(query_lower)}
+        filters = self._keyword_filters(keywords)
         
         # Get sample data
         try:
-            if filters or 'sample' in query_lower or 'show' in query_lower:
-                context["sample_data"] = self.query_records(filters if filters else {'limit': 20})
-        except Exception as e:
-            print(f"Error getting sample data: {e}")
+            if filters or 'sample' in keywords:
+                filters = filters or {'limit': 20}
+                context["sample_data"] = self._cached_result(
+                    ('context_sample', tuple(sorted(filters.items()))),
+                    lambda: self._context_sample(filters)
+                )
+            with self._cache_lock:
+                self._context_cache[cache_key] = context["sample_data"]
+        except Exception:
+            log.exception("❌ Error getting sample data")
         
         return context
     
+    @staticmethod
+    def _keyword_filters(keywords) -> Dict[str, Any]:
+        """
+        Merge the _KEYWORD_RULES filters of every matched bucket into one spec
+        
+        Overlapping keys are combined with _FILTER_MERGE (largest limit,
+        tightest depth band). A bucket whose depth band would contradict the
+        ones already merged, e.g. "deep" after "surface", is skipped so the
+        earlier bucket wins.
+        """
+        filters = {}
+        for bucket, rule in _KEYWORD_RULES:
+            if bucket not in keywords:
+                continue
+            merged = dict(filters)
+            for key, value in rule.items():
+                merged[key] = _FILTER_MERGE[key](merged[key], value) if key in merged else value
+            if merged.get('min_depth', float('-inf')) > merged.get('max_depth', float('inf')):
+                continue
+            filters = merged
+        return filters
+    
     def get_temperature_profile(self, platform: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get temperature vs depth profile
         
+        Reads the argo_temp_profile aggregates rebuilt at ingest time rather
+        than averaging the raw measurements on every call. Depths are the
+        centres of the 5 dbar bins the measurements were averaged into.
+        
         Args:
             platform: Optional float ID to filter by
         
         Returns:
             List of depth/temperature pairs
         """
-        session = self._get_session()
+        return self._cached_result(
+            ('profile', platform or None),
+            lambda: self._load_temperature_profile(platform)
+        )
+    
+    def _load_temperature_profile(self, platform: Optional[str]) -> List[Dict[str, Any]]:
+        """Query one (or the all-floats) profile behind get_temperature_profile"""
+        with SessionLocal() as session:
+            query = session.query(
+                TempProfile.depth,
+                (func.sum(TempProfile.temp_sum) / func.sum(TempProfile.temp_count)).label('avg_temp')
+            )
         
-        query = session.query(
-            ArgoRecord.depth,
-            func.avg(ArgoRecord.temperature).label('avg_temp')
-        ).filter(ArgoRecord.temperature.isnot(None))
+            if platform:
+                query = query.filter(TempProfile.platform == platform)
         
-        if platform:
-            query = query.filter(ArgoRecord.platform == platform)
+            query = query.group_by(TempProfile.depth).order_by(TempProfile.depth)
         
-        query = query.group_by(ArgoRecord.depth).order_by(ArgoRecord.depth)
+            results = query.all()
         
-        results = query.all()
+        return _profile_points([(r.depth, r.avg_temp) for r in results])
+    
+    def get_temperature_profiles(self, platforms: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get temperature vs depth profiles for several floats in one query
         
-        return [
-            {
-                "depth": float(r.depth),
-                "temperature": round(float(r.avg_temp), 2)
-            }
-            for r in results
-        ]
+        Args:
+            platforms: Optional float IDs to include (all floats when omitted)
+        
+        Returns:
+            Dictionary mapping each float ID to its depth/temperature pairs;
+            floats with no temperature data are left out
+        """
+        return self._cached_result(
+            ('profiles', tuple(sorted(platforms)) if platforms else None),
+            lambda: self._load_temperature_profiles(platforms)
+        )
     
-    def __del__(self):
-        """Close database session on cleanup"""
-        if self.session:
-            self.session.close()
+    def _load_temperature_profiles(self, platforms: Optional[List[str]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Query the per-float profiles behind get_temperature_profiles"""
+        with SessionLocal() as session:
+            # argo_temp_profile already holds one row per (platform, depth)
+            query = session.query(
+                TempProfile.platform,
+                TempProfile.depth,
+                (TempProfile.temp_sum / TempProfile.temp_count).label('avg_temp')
+            )
+            
+            if platforms:
+                query = query.filter(TempProfile.platform.in_(platforms))
+            else:
+                query = query.filter(TempProfile.platform.isnot(None))
+            
+            query = query.order_by(TempProfile.platform, TempProfile.depth)
+            
+            results = query.all()
+        
+        points = _profile_points([(r.depth, r.avg_temp) for r in results])
+        profiles = {}
+        for r, point in zip(results, points):
+            profiles.setdefault(r.platform, []).append(point)
+        return profiles
@@ -0,0 +1,15 @@
+"""
+WSGI entrypoint for production servers
+
+Patches the standard library for gevent before the app (and requests/openai)
+are imported, so socket waits on Ollama/OpenAI calls yield to other requests.
+
+Run with: gunicorn wsgi:app
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+from app import app  # noqa: E402
+
+__all__ = ['app']